@@ -0,0 +1,158 @@
+"""
+Кэш уже разобранных расписаний групп, чтобы не разбирать одну и ту же страницу на каждый запрос.
+"""
+import datetime
+import logging
+import time
+
+from BL import snapshot
+from BL.cur_week import get_cur_week
+from BL.index import ScheduleIndex
+from BL.parser import parse, parse_url
+from BL.schedule import Days
+
+
+class ScheduleCache:
+    """
+    Кэш разобранных недель по ключу (id группы, номер недели).
+
+    Запись считается устаревшей на следующий день - так же, как и сохранённые страницы в tmp.
+    Каждая сохранённая неделя сразу попадает в обратный индекс (см. BL.index).
+    Если указан файл снимка, кэш загружается из него при первом обращении и сохраняется методом save().
+    """
+
+    def __init__(self, snapshot_filename: str = None):
+        """
+        :param snapshot_filename: файл снимка кэша (см. BL.snapshot), None - без сохранения на диск.
+        """
+        self.__weeks: dict[tuple[str, int], tuple[datetime.date, str, Days]] = {}
+        self.__index = ScheduleIndex()
+
+        self.snapshot_filename = snapshot_filename
+        self.__loaded = snapshot_filename is None
+        self.__dirty = False
+        self.__evicted_on = datetime.date.today()
+
+    def __load(self):
+        """Загружает свежие записи из снимка (один раз, при первом обращении к кэшу)."""
+        self.__loaded = True
+
+        start = time.perf_counter()
+        weeks = snapshot.load(self.snapshot_filename)
+        if not isinstance(weeks, dict):
+            return
+
+        today = datetime.date.today()
+        for key, (parsed, group, days) in weeks.items():
+            # Записи с прошлых дней всё равно пришлось бы разобрать заново
+            if parsed == today and key not in self.__weeks:
+                self.__weeks[key] = (parsed, group, days)
+                self.__index.update(key, group, days)
+
+        logging.info(f"Из снимка загружено {len(self.__weeks)} недель "
+                     f"за {(time.perf_counter() - start) * 1000:.1f} мс")
+
+    @property
+    def index(self) -> ScheduleIndex:
+        """Обратный индекс по закэшированным неделям (снимок загружается при первом обращении)."""
+        if not self.__loaded:
+            self.__load()
+        self.__evict()
+        return self.__index
+
+    def __evict(self):
+        """
+        Раз в день удаляет устаревшие записи (разобранные в прошлые дни или за прошедшие недели)
+        из кэша и обратного индекса, чтобы память не росла с каждым днём работы бота.
+        """
+        today = datetime.date.today()
+        if self.__evicted_on == today:
+            return
+        self.__evicted_on = today
+
+        cur_week = get_cur_week(today)
+        expired = [key for key, (parsed, _, _) in self.__weeks.items() if parsed != today or key[1] < cur_week]
+        for key in expired:
+            del self.__weeks[key]
+            self.__index.remove(key)
+
+        if expired:
+            self.__dirty = True
+            logging.info(f"Из кэша удалено {len(expired)} устаревших недель")
+
+    def save(self) -> bool:
+        """
+        Сохраняет кэш в файл снимка, если с прошлого сохранения что-то изменилось.
+
+        :return: был ли записан снимок.
+        """
+        self.__evict()
+        if self.snapshot_filename is None or not self.__dirty:
+            return False
+
+        size = snapshot.save(self.snapshot_filename, self.__weeks)
+        self.__dirty = False
+        logging.info(f"Снимок кэша сохранён: {len(self.__weeks)} недель, {size} байт")
+        return True
+
+    def get(self, schedule_url: str) -> tuple[str, Days]:
+        """
+        Возвращает расписание на неделю, разбирая страницу только при отсутствии свежей записи.
+
+        :param schedule_url: ссылка на расписание группы.
+        :return: название группы и список учебных дней.
+        """
+        if cached := self.lookup(schedule_url):
+            return cached
+
+        group, days = parse(schedule_url)
+        self.put(parse_url(schedule_url), group, days)
+        return group, days
+
+    def lookup(self, schedule_url: str) -> tuple[str, Days] | None:
+        """
+        Возвращает свежую запись из кэша, не разбирая страницу.
+
+        :param schedule_url: ссылка на расписание группы.
+        :return: название группы и список учебных дней или None, если свежей записи нет.
+        """
+        if not self.__loaded:
+            self.__load()
+        self.__evict()
+
+        entry = self.__weeks.get(parse_url(schedule_url))
+        if entry is None or entry[0] != datetime.date.today():
+            return None
+
+        _, group, days = entry
+        return group, days
+
+    def put(self, key: tuple[str, int], group: str, days: Days):
+        """Сохраняет разобранную неделю группы и обновляет индекс."""
+        self.__weeks[key] = (datetime.date.today(), group, days)
+        self.__index.update(key, group, days)
+        self.__dirty = True
+
+    def grids(self, group_ids=None, week: int = None) -> dict:
+        """
+        Сетки занятости закэшированных групп для векторных запросов из BL.grid.
+
+        :param group_ids: id интересующих групп, по умолчанию - все закэшированные.
+        :param week: номер недели, по умолчанию - текущая.
+        :return: словарь id группы -> сетка недели.
+        """
+        if not self.__loaded:
+            self.__load()
+        self.__evict()
+
+        week = get_cur_week() if week is None else week
+        group_ids = None if group_ids is None else set(group_ids)
+        return {group_id: days.grid
+                for (group_id, selected_week), (_, _, days) in self.__weeks.items()
+                if (group_ids is None or group_id in group_ids) and selected_week == week}
+
+    def __contains__(self, key: tuple[str, int]):
+        return key in self.__weeks
+
+    def __len__(self):
+        return len(self.__weeks)
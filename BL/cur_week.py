@@ -1,7 +1,8 @@
 from datetime import date, timedelta
 
 
-def get_cur_week(cur_date: date = date.today()):
+def get_cur_week(cur_date: date = None):
+    cur_date = cur_date or date.today()
     year = cur_date.year if 9 <= cur_date.month <= 12 else cur_date.year - 1
     first_september = date(year, 9, 1)
     date_first_learn_week = first_september - timedelta(days=first_september.weekday())
@@ -0,0 +1,136 @@
+"""
+Компактное представление учебной недели в виде массивов NumPy и векторные запросы по многим группам сразу.
+
+Неделя хранится как сетка 6×MAX_PAIRS: строка - день недели, столбец - номер пары.
+"""
+import threading
+from typing import Sequence
+
+import numpy as np
+
+from BL.schedule import MAX_PAIRS
+
+# Кол-во дней в учебной неделе (совпадает с Days.MAX_DAYS)
+MAX_DAYS = 6
+
+# Общий для всех групп справочник кодов аудиторий, 0 - аудитория не указана
+room_codes: dict[str, int] = {}
+# Сетки строятся и при разборе в рабочих потоках (см. UI.broadcast), поэтому выдача кодов под блокировкой
+room_codes_lock = threading.Lock()
+
+
+def get_room_code(location: str) -> int:
+    """
+    Возвращает код аудитории, заводя новый при первом упоминании.
+
+    :param location: название аудитории.
+    :return: целочисленный код аудитории (0 для пустого названия).
+    """
+    location = location.strip().lower()
+    if not location:
+        return 0
+    with room_codes_lock:
+        return room_codes.setdefault(location, len(room_codes) + 1)
+
+
+class WeekGrid:
+    """
+    Сетка занятости одной учебной недели.
+
+    occupied - есть ли пара в данном слоте,
+    types - тип пары (0 - окно, далее как в Pair.pair_type),
+    rooms - код аудитории (см. get_room_code).
+    Если в одном слоте несколько пар, типом и аудиторией слота считаются первые из них.
+    """
+
+    def __init__(self, days=()):
+        """
+        Строит сетку по списку учебных дней.
+
+        :param days: учебные дни недели (Day) по порядку с понедельника.
+        """
+        self.occupied = np.zeros((MAX_DAYS, MAX_PAIRS), dtype=bool)
+        self.types = np.zeros((MAX_DAYS, MAX_PAIRS), dtype=np.int8)
+        self.rooms = np.zeros((MAX_DAYS, MAX_PAIRS), dtype=np.int32)
+
+        for position, day in enumerate(days):
+            index = day.date.weekday() if day.date else position
+            if index >= MAX_DAYS:
+                continue
+            for pair in day.existing():
+                slot = pair.number - 1
+                if self.occupied[index, slot]:
+                    continue
+                self.occupied[index, slot] = True
+                self.types[index, slot] = pair.pair_type
+                self.rooms[index, slot] = get_room_code(pair.place.location)
+
+    def pairs_range(self) -> tuple[int, int]:
+        """
+        Номера самой ранней и самой поздней пары за неделю.
+
+        :return: (минимальный, максимальный) номер пары или (0, 0), если пар нет.
+        """
+        slots = np.flatnonzero(self.occupied.any(axis=0))
+        if not slots.size:
+            return 0, 0
+        return int(slots[0]) + 1, int(slots[-1]) + 1
+
+
+def stack(grids: Sequence[WeekGrid]) -> np.ndarray:
+    """
+    Объединяет сетки занятости нескольких групп в один массив.
+
+    :param grids: сетки недель групп.
+    :return: логический массив формы (кол-во групп, MAX_DAYS, MAX_PAIRS).
+    """
+    if not grids:
+        return np.zeros((0, MAX_DAYS, MAX_PAIRS), dtype=bool)
+    return np.stack([grid.occupied for grid in grids])
+
+
+def first_last_pairs(grids: Sequence[WeekGrid]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Номера первой и последней пары каждого дня для каждой группы.
+
+    :param grids: сетки недель групп.
+    :return: два массива формы (кол-во групп, MAX_DAYS), 0 - в этот день пар нет.
+    """
+    occupied = stack(grids)
+    has_pairs = occupied.any(axis=2)
+    first = np.argmax(occupied, axis=2) + 1
+    last = MAX_PAIRS - np.argmax(occupied[:, :, ::-1], axis=2)
+    return np.where(has_pairs, first, 0), np.where(has_pairs, last, 0)
+
+
+def common_free_windows(grids: Sequence[WeekGrid], only_windows: bool = True) -> np.ndarray:
+    """
+    Слоты, в которые свободны все указанные группы.
+
+    :param grids: сетки недель групп.
+    :param only_windows: учитывать только слоты между первой и последней парой дня
+     хотя бы одной из групп (окна), иначе - все свободные слоты недели.
+    :return: логический массив формы (MAX_DAYS, MAX_PAIRS).
+    """
+    busy = stack(grids).any(axis=0)
+    free = ~busy
+    if not only_windows:
+        return free
+
+    has_pairs = busy.any(axis=1, keepdims=True)
+    first = np.argmax(busy, axis=1)[:, None]
+    last = (MAX_PAIRS - 1 - np.argmax(busy[:, ::-1], axis=1))[:, None]
+    slots = np.arange(MAX_PAIRS)
+    return free & has_pairs & (slots >= first) & (slots <= last)
+
+
+def free_groups(grids: Sequence[WeekGrid], day: int, number: int) -> np.ndarray:
+    """
+    Какие из групп свободны в заданный слот.
+
+    :param grids: сетки недель групп.
+    :param day: день недели (0 - понедельник).
+    :param number: номер пары начиная с 1.
+    :return: логический массив длины кол-ва групп.
+    """
+    return ~stack(grids)[:, day, number - 1]
@@ -0,0 +1,114 @@
+"""
+Обратный индекс по закэшированным расписаниям: преподаватель, аудитория и дисциплина -> (дата, номер пары) -> (группа, аудитория).
+"""
+import datetime
+from collections import defaultdict
+
+from BL.schedule import Days
+
+LECTOR = 'lector'
+ROOM = 'room'
+DISCIPLINE = 'discipline'
+
+KINDS = (LECTOR, ROOM, DISCIPLINE)
+
+
+def normalize(name: str) -> str:
+    """Приводит имя к виду ключа индекса: нижний регистр и одиночные пробелы."""
+    return ' '.join(name.lower().split())
+
+
+def get_postings(group: str, days: Days) -> set[tuple[str, str, datetime.date, int, str, str]]:
+    """
+    Собирает все записи индекса для недели одной группы.
+
+    :param group: название группы.
+    :param days: разобранная неделя группы.
+    :return: множество записей (вид, ключ, дата, номер пары, группа, аудитория).
+    """
+    postings = set()
+    for day, pair in days.existing():
+        keys = {
+            LECTOR: {normalize(str(pair.lector))},
+            ROOM: {normalize(str(pair.place))},
+            DISCIPLINE: {normalize(str(pair.discipline))},
+        }
+        # Преподавателя ищут в основном по фамилии, поэтому индексируем и её отдельно
+        keys[LECTOR].update(name.split()[0] for name in tuple(keys[LECTOR]) if name)
+
+        room = 'online' if pair.place.online else str(pair.place).strip()
+        for kind, names in keys.items():
+            postings.update((kind, name, day.date, pair.number, group, room) for name in names if name)
+    return postings
+
+
+class ScheduleIndex:
+    """
+    Инкрементально обновляемый индекс: при каждом разборе недели группы
+    удаляются только исчезнувшие записи и добавляются только новые.
+    """
+
+    def __init__(self):
+        # вид -> ключ -> (дата, номер пары) -> пары (группа, аудитория)
+        self.__postings = {kind: defaultdict(lambda: defaultdict(set)) for kind in KINDS}
+        # неделя группы -> её записи, чтобы при обновлении можно было посчитать разницу
+        self.__by_week: dict[tuple[str, int], set[tuple]] = {}
+
+    def update(self, key: tuple[str, int], group: str, days: Days):
+        """
+        Обновляет индекс по новой версии недели группы.
+
+        :param key: ключ недели в кэше (id группы, номер недели).
+        :param group: название группы.
+        :param days: разобранная неделя.
+        """
+        old = self.__by_week.get(key, set())
+        new = get_postings(group, days)
+
+        for kind, name, date, number, *hit in old - new:
+            self.__discard(kind, name, (date, number), tuple(hit))
+
+        for kind, name, date, number, *hit in new - old:
+            self.__postings[kind][name][(date, number)].add(tuple(hit))
+
+        self.__by_week[key] = new
+
+    def remove(self, key: tuple[str, int]):
+        """Удаляет из индекса все записи недели группы."""
+        for kind, name, date, number, *hit in self.__by_week.pop(key, set()):
+            self.__discard(kind, name, (date, number), tuple(hit))
+
+    def __discard(self, kind: str, name: str, slot: tuple[datetime.date, int], hit: tuple[str, str]):
+        slots = self.__postings[kind][name]
+        slots[slot].discard(hit)
+        if not slots[slot]:
+            del slots[slot]
+        if not slots:
+            del self.__postings[kind][name]
+
+    def find(self, kind: str, name: str, date: datetime.date, number: int) -> set[tuple[str, str]]:
+        """
+        Группы и аудитории, где в заданный слот идёт пара с данным преподавателем, аудиторией или дисциплиной.
+
+        :param kind: вид ключа (LECTOR, ROOM или DISCIPLINE).
+        :param name: имя преподавателя, название аудитории или дисциплины.
+        :param date: дата.
+        :param number: номер пары.
+        :return: множество пар (группа, аудитория), пустое, если совпадений нет.
+        """
+        slots = self.__postings[kind].get(normalize(name))
+        if not slots:
+            return set()
+        return set(slots.get((date, number), ()))
+
+    def lookup(self, kind: str, name: str) -> dict[tuple[datetime.date, int], set[tuple[str, str]]]:
+        """
+        Все известные слоты для преподавателя, аудитории или дисциплины.
+
+        :return: словарь (дата, номер пары) -> множество пар (группа, аудитория).
+        """
+        slots = self.__postings[kind].get(normalize(name), {})
+        return {slot: set(hits) for slot, hits in slots.items()}
+
+    def __len__(self):
+        return len(self.__by_week)
@@ -4,38 +4,54 @@ https://ssau.ru/
 """
 import datetime
 import logging
-import math
 import os
 import re
 
-import requests
-from bs4 import BeautifulSoup, FeatureNotFound
-
 from BL.cur_week import get_cur_week
-from BL.schedule import Days, Pair, Lector, Room, Day
+from BL.schedule import Days, Pair, Lector, Room, Day, MAX_PAIRS
 
 tmp_path = 'tmp'
+# Таймаут запроса страницы расписания в секундах
+REQUEST_TIMEOUT = 15
 
 
 def clear():
     for filename in os.listdir(tmp_path):
         if filename.startswith(datetime.datetime.now().strftime('%d-%m-%y')):
             continue
-        os.remove(os.path.join(tmp_path, filename))
+        try:
+            os.remove(os.path.join(tmp_path, filename))
+        except FileNotFoundError:
+            # файл уже удалил параллельный разбор
+            pass
 
 
-def get_source(url: str) -> str:
+def parse_url(url: str) -> tuple[str, int]:
+    """
+    Достаёт из ссылки на расписание id группы и номер недели.
+    :return: id группы и номер недели (по умолчанию текущей).
+    """
     group_id = match.group(1) if (match := re.search(r"groupId=(\d+)", url)) else None
-    selected_week = match.group(1) if (match := re.search(r"selectedWeek=(\d+)", url)) else get_cur_week()
+    selected_week = int(match.group(1)) if (match := re.search(r"selectedWeek=(\d+)", url)) else get_cur_week()
 
     if not group_id:
         raise AttributeError("Некорректная ссылка")
 
-    filename = os.path.join(tmp_path, f"{datetime.datetime.now().strftime('%d-%m-%y')}_{group_id}.html")
+    return group_id, selected_week
+
+
+def get_source(url: str) -> str:
+    group_id, selected_week = parse_url(url)
+
+    filename = os.path.join(tmp_path, f"{datetime.datetime.now().strftime('%d-%m-%y')}_{group_id}_{selected_week}.html")
     if not os.path.exists(filename):
+        # requests тянет за собой много модулей, поэтому импортируем только при реальной загрузке
+        import requests
+
         if not os.path.isdir(tmp_path):
             os.mkdir(tmp_path)
-        request = requests.get(f"https://ssau.ru/rasp?groupId={group_id}&selectedWeek={selected_week}")
+        request = requests.get(f"https://ssau.ru/rasp?groupId={group_id}&selectedWeek={selected_week}",
+                               timeout=REQUEST_TIMEOUT)
         if request.status_code == 200:
             with open(filename, mode='w', encoding='utf-8') as f:
                 f.write(request.text)
@@ -45,16 +61,6 @@ def get_source(url: str) -> str:
         return f.read()
 
 
-def reshape(roll, length):
-    """
-    Создаёт из одномерного массива двумерный, объединяя в строку по {param} элементов.
-    :param roll: исходный список.
-    :param length: по сколько элементов объединять.
-    :return: новый список с объединёнными массивами
-    """
-    return [roll[(cur_pos := i * length):cur_pos + length] for i in range(math.ceil(len(roll) / length))]
-
-
 def transpose(roll):
     return list(zip(*roll))
 
@@ -64,6 +70,9 @@ def parse(schedule_url: str) -> tuple[str, Days]:
     Возвращает расписание на неделю.
     :return: объект списка учебных дней
     """
+    # bs4 и lxml нужны только при разборе страницы, не тратим на них время при старте бота
+    from bs4 import BeautifulSoup, FeatureNotFound
+
     clear()
 
     src = get_source(schedule_url)
@@ -80,8 +89,10 @@ def parse(schedule_url: str) -> tuple[str, Days]:
     # Кол-во дней в учебной недели
     amount_days = 6
 
-    pairs = []
-    # добавляем пары или дату пробегая одну за другой ячейки таблицы (данная таблица читается построчно)
+    # пары сразу раскладываются по слотам: slots[день][номер пары - 1]
+    slots = [[[] for _ in range(MAX_PAIRS)] for _ in range(amount_days)]
+    # порядковый номер ячейки с парой (таблица читается построчно: строка - номер пары, столбец - день)
+    cell = 0
     for item in soup.find_all("div", class_="schedule__item"):
 
         # Случай когда рассматриваемая ячейка является заголовком (header)
@@ -92,41 +103,45 @@ def parse(schedule_url: str) -> tuple[str, Days]:
                 days_dates.append(datetime.date(year, month, day))
             continue
 
-        # Сразу считаем номер текущей пары
-        number_pair = len(pairs) // amount_days + 1
+        # Сразу считаем день и номер текущей пары по позиции ячейки
+        number_day, number_pair = cell % amount_days, cell // amount_days + 1
+        cell += 1
 
-        # Случай когда рассматриваемая ячейка является парой (содержит имя лекции)
-        if lesson := item.find("div", class_="schedule__lesson"):
+        if number_pair > MAX_PAIRS:
+            logging.debug(f'Ячейка за пределами сетки расписания: пара {number_pair}')
+            continue
 
-            # Перебор всех типов пар
-            pair_type = 1
-            while True:
-                var = f"body-text schedule__discipline lesson-color lesson-color-type-{pair_type}"
-                if discipline_name := lesson.find("div", class_=var):
-                    discipline_name = discipline_name.text.strip()
-                    break
-                pair_type += 1
+        # Случай когда рассматриваемая ячейка содержит пары (в одно время их может быть несколько)
+        if lessons := item.find_all("div", class_="schedule__lesson"):
+            for lesson in lessons:
 
-            if place := lesson.find("div", class_="caption-text schedule__place"):
-                place = place.text.strip()
+                # Перебор всех типов пар
+                pair_type = 1
+                while True:
+                    var = f"body-text schedule__discipline lesson-color lesson-color-type-{pair_type}"
+                    if discipline_name := lesson.find("div", class_=var):
+                        discipline_name = discipline_name.text.strip()
+                        break
+                    pair_type += 1
 
-            if teacher := lesson.find("div", class_="schedule__teacher"):
-                teacher = teacher.text.strip()
+                if place := lesson.find("div", class_="caption-text schedule__place"):
+                    place = place.text.strip()
 
-            if groups := lesson.find("div", class_="schedule__groups"):
-                groups = groups.text.strip().split()
+                if teacher := lesson.find("div", class_="schedule__teacher"):
+                    teacher = teacher.text.strip()
 
-            pairs.append(Pair(discipline_name, Lector(teacher), Room(place), number_pair, pair_type, groups))
+                if groups := lesson.find("div", class_="schedule__groups"):
+                    groups = groups.text.strip().split()
 
-        # В противном случае если ячейка пуста считаем пару окном
-        elif item.text == "":
-            pairs.append(Pair("", number=number_pair, exist=False))
+                slots[number_day][number_pair - 1].append(
+                    Pair(discipline_name, Lector(teacher), Room(place), number_pair, pair_type, groups))
 
-        # Пропускаем если ячейка не подходит не под один из вариантов
-        else:
+        # Пустая ячейка - окно, его добавит сам учебный день
+        elif item.text != "":
+            # Пропускаем если ячейка не подходит не под один из вариантов
             logging.debug('Необработанная непустая ячейка')
 
-    days = [Day(pairs, date) for date, *pairs in zip(days_dates, *reshape(pairs, amount_days))]
+    days = [Day(date=date, slots=day_slots) for date, day_slots in zip(days_dates, slots)]
     d = Days(datetime.date.today().year, days)
     return group, d
 
@@ -1,9 +1,6 @@
 import datetime
 import re
 from copy import deepcopy
-from itertools import zip_longest
-
-from prettytable import PrettyTable
 
 from BL.abbreviator import short
 
@@ -25,6 +22,21 @@ ru_names_days = {
 MAX_PAIRS = len(timetable)
 
 
+def get_pair_number(time: datetime.time) -> int | None:
+    """
+    Номер пары, идущей в заданное время.
+
+    :param time: время дня.
+    :return: номер пары начиная с 1 или None, если пары в это время нет.
+    """
+    moment = time.strftime('%H:%M')
+    for number, interval in enumerate(timetable, 1):
+        start, end = interval.split(' - ')
+        if start <= moment <= end:
+            return number
+    return None
+
+
 class Room:
     def __init__(self, location: str = "", online=False):
         self.location = location
@@ -90,6 +102,8 @@ class Pair:
 
     def __str__(self):
         if self.exist:
+            from prettytable import PrettyTable
+
             table = PrettyTable(['Номер', 'Пара', 'Место', 'Чел'])
             table.add_row([self.number, self.discipline, self.place, self.lector])
             return str(table)
@@ -103,25 +117,35 @@ class Pair:
         return self.number
 
 
+# Окна никогда не изменяются, поэтому все дни используют одни и те же объекты для каждого номера пары
+windows = tuple(Pair('', number=number, exist=False) for number in range(1, MAX_PAIRS + 1))
+
+
 class Day:
     """
     Класс одного учебного дня
     """
     HEADERS = ['Номер', 'Время', 'Дисциплина', 'Лектор', 'Место']
 
-    def __init__(self, pairs: list[Pair] = None, date: datetime.date = None, name: str = None):
+    def __init__(self, pairs: list[Pair] = None, date: datetime.date = None, name: str = None,
+                 slots: list[list[Pair]] = None):
         """
         Конструктор учебного дня.
 
         :param date: дата данного дня.
         :param pairs: список пар в данный день
+        :param slots: пары, уже разложенные по номерам (slots[номер - 1] - пары в этот слот),
+         в этом случае pairs игнорируется.
         """
         assert date or name, "У дня должен быть идентификатор (имя или дата)"
         self.__pairs = pairs or []
         self.name = name or ru_names_days['full'][date.weekday()]
         self.date = date
 
-        self.__update()
+        if slots is None:
+            self.__update()
+        else:
+            self.__fill(slots)
 
     @property
     def pairs(self):
@@ -137,9 +161,11 @@ class Day:
         self.__update()
 
     def __str__(self):
-        if not self.__pairs:
+        if not int(self):
             return ""
 
+        from prettytable import PrettyTable
+
         table = PrettyTable(Day.HEADERS)
 
         table.add_rows([[pair.number, timetable[pair.number - 1], pair.discipline, pair.lector, pair.place]
@@ -155,6 +181,14 @@ class Day:
     def __iter__(self):
         return iter(deepcopy(self.__pairs))
 
+    def existing(self):
+        """
+        Итератор по существующим парам без копирования (только для чтения).
+
+        :return: генератор существующих пар в данный день.
+        """
+        return (pair for pair in self.__pairs if pair.exist)
+
     def __int__(self):
         """
         Преобразование к целому числу.
@@ -177,32 +211,26 @@ class Day:
 
     def __update(self):
         """
-        Сортирует пары по их номерам и добавляет фиктивные (окна) в случае необходимости.
+        Раскладывает пары по слотам их номеров и добавляет фиктивные (окна) в пустые слоты.
+        """
+        slots = [[] for _ in range(MAX_PAIRS)]
+        for pair in self.__pairs:
+            if pair.exist:
+                slots[pair.number - 1].append(pair)
+
+        self.__fill(slots)
+
+    def __fill(self, slots: list[list[Pair]]):
+        """
+        Собирает список пар дня из слотов за один проход, пустые слоты становятся окнами.
+        Несколько пар в одном слоте идут подряд в порядке добавления.
         """
         buff = []
-        number = 1
-        try:
-            # на всякий случай создаём отсортированный по номеру пар итератор
-            pairs = iter(sorted(self.__pairs))
-            cur_pair = next(pairs)
-            while number <= MAX_PAIRS:
-                if number == cur_pair.number:
-                    buff.append(cur_pair)
-                    cur_pair = next(pairs)
-                else:
-                    # Добавление фиктивной пары
-                    buff.append(Pair('', number=number, exist=False))
-
-                # Если номер пары изменился - двигаемая дальше
-                while cur_pair.number == number:
-                    # Логика добавления нескольких пар в одно время
-                    buff.append(cur_pair)
-                    cur_pair = next(pairs)
-
-                number += 1
-
-        except StopIteration:
-            pass
+        for window, slot in zip(windows, slots):
+            if slot:
+                buff.extend(slot)
+            else:
+                buff.append(window)
 
         self.__pairs = buff
 
@@ -222,6 +250,7 @@ class Days:
         self.__days = days or []
         self.__min_pair_in_days = 0
         self.__max_pair_in_days = 0
+        self.__grid = None
 
         self.__header = None
         self.__check_days()
@@ -254,23 +283,53 @@ class Days:
     def days(self):
         return deepcopy(self.__days)
 
+    def existing(self):
+        """
+        Итератор по существующим парам недели без копирования (только для чтения).
+
+        :return: генератор пар (день, пара).
+        """
+        return ((day, pair) for day in self.__days for pair in day.existing())
+
+    @property
+    def grid(self):
+        """Сетка занятости недели (см. BL.grid.WeekGrid)."""
+        return self.__grid
+
+    def __getstate__(self):
+        # Сетка - производные данные с кодами аудиторий текущего процесса, её не сохраняем
+        state = self.__dict__.copy()
+        state['_Days__grid'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__update()
+
     def __update(self):
         """Пересчитывает все вычисляемые свойства."""
-        if self.__days:
-            self.__min_pair_in_days = min(int(pair) for day in self.__days for pair in day.pairs if pair.exist)
-            self.__max_pair_in_days = max(int(pair) for day in self.__days for pair in day.pairs if pair.exist)
-            # print('[!!!]', self.__min_pair_in_days, self.__max_pair_in_days)
+        # numpy импортируется только при построении первой недели, а не при старте
+        from BL.grid import WeekGrid
+
+        self.__grid = WeekGrid(self.__days)
+        self.__min_pair_in_days, self.__max_pair_in_days = self.__grid.pairs_range()
 
     def __str__(self) -> str:
         if not self.__days:
             return ""
 
+        from prettytable import PrettyTable
+
         header = ['Время'] + self.__header
         table = PrettyTable(header)
 
-        for time, *pairs in zip_longest(timetable[self.__min_pair_in_days:self.__max_pair_in_days + 1], *self.__days,
-                                        fillvalue=Pair('', exist=False)):
-            table.add_row([time] + pairs)
+        rows = [[[] for _ in self.__days] for _ in range(MAX_PAIRS)]
+        for column, day in enumerate(self.__days):
+            for pair in day.existing():
+                rows[pair.number - 1][column].append(str(pair))
+
+        for number in range(self.__min_pair_in_days or 1, self.__max_pair_in_days + 1):
+            table.add_row([timetable[number - 1]] + ['\n'.join(cell) for cell in rows[number - 1]])
 
         return str(table)
 
@@ -0,0 +1,73 @@
+"""
+Сохранение кэша разобранных расписаний на диск, чтобы после перезапуска бот сразу отвечал из тёплого кэша.
+
+Формат файла: заголовок (сигнатура, версия формата, длина и CRC32 данных) и pickle протокола 5.
+"""
+import logging
+import os
+import pickle
+import struct
+import zlib
+
+MAGIC = b'SCHEDSNP'
+# Увеличивать при любом изменении классов из BL.schedule или структуры кэша
+VERSION = 1
+
+HEADER = struct.Struct(f'<{len(MAGIC)}sHQI')
+
+
+def save(path: str, data) -> int:
+    """
+    Атомарно записывает снимок: сначала во временный файл, затем переименование.
+
+    :param path: путь к файлу снимка.
+    :param data: сохраняемые данные.
+    :return: размер записанного файла в байтах.
+    """
+    payload = pickle.dumps(data, protocol=5)
+    header = HEADER.pack(MAGIC, VERSION, len(payload), zlib.crc32(payload))
+
+    if directory := os.path.dirname(path):
+        os.makedirs(directory, exist_ok=True)
+
+    tmp_filename = f"{path}.tmp"
+    with open(tmp_filename, mode='wb') as f:
+        f.write(header)
+        f.write(payload)
+    os.replace(tmp_filename, path)
+
+    return HEADER.size + len(payload)
+
+
+def load(path: str):
+    """
+    Читает снимок. Повреждённый или устаревший снимок удаляется.
+
+    :param path: путь к файлу снимка.
+    :return: сохранённые данные или None, если снимка нет или он непригоден.
+    """
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with open(path, mode='rb') as f:
+            raw = f.read()
+
+        magic, version, length, checksum = HEADER.unpack_from(raw)
+        if magic != MAGIC:
+            raise ValueError("неизвестная сигнатура")
+        if version != VERSION:
+            raise ValueError(f"версия {version}, ожидалась {VERSION}")
+
+        payload = memoryview(raw)[HEADER.size:]
+        if len(payload) != length or zlib.crc32(payload) != checksum:
+            raise ValueError("не совпадает длина или контрольная сумма")
+
+        return pickle.loads(payload)
+    except Exception as error:
+        logging.warning(f"Снимок кэша {path} отброшен: {error}")
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        return None
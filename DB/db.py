@@ -6,6 +6,25 @@ class BotDB:
     def __init__(self, db_file):
         self.connection = sqlite3.connect(db_file)
         self.cursor = self.connection.cursor()
+        self.create_broadcast_tables()
+
+    def create_broadcast_tables(self):
+        """Создаём таблицы очереди рассылки, если их ещё нет"""
+        # Тексты хранятся один раз на группу, а в очереди - только указатель на следующее сообщение
+        self.cursor.execute("""CREATE TABLE IF NOT EXISTS `broadcast_messages` (
+            `broadcast_id` TEXT NOT NULL,
+            `group_id` TEXT NOT NULL,
+            `seq` INTEGER NOT NULL,
+            `text` TEXT NOT NULL,
+            PRIMARY KEY (`broadcast_id`, `group_id`, `seq`))""")
+        self.cursor.execute("""CREATE TABLE IF NOT EXISTS `broadcast_queue` (
+            `broadcast_id` TEXT NOT NULL,
+            `user_id` INTEGER NOT NULL,
+            `group_id` TEXT NOT NULL,
+            `next_seq` INTEGER NOT NULL DEFAULT 0,
+            `done` INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (`broadcast_id`, `user_id`))""")
+        return self.connection.commit()
 
     def user_exists(self, user_id):
         """Проверяем, есть ли юзер в базе"""
@@ -32,6 +51,76 @@ class BotDB:
         result = self.cursor.execute("SELECT `schedule_link` FROM `users` WHERE `user_id` = ?", (user_id,))
         return result.fetchone()[0]
 
+    def set_subscription(self, user_id, status: bool):
+        """Подписываем или отписываем пользователя от еженедельной рассылки"""
+        self.cursor.execute("UPDATE `users` SET `subscription_status` = ? WHERE `user_id` = ?", (int(status), user_id))
+        return self.connection.commit()
+
+    def get_subscription(self, user_id):
+        """Получаем статус подписки пользователя на рассылку"""
+        result = self.cursor.execute("SELECT `subscription_status` FROM `users` WHERE `user_id` = ?", (user_id,))
+        return bool(result.fetchone()[0])
+
+    def get_subscribers(self):
+        """Получаем (user_id, schedule_link) всех подписчиков с указанной ссылкой на расписание"""
+        result = self.cursor.execute("SELECT `user_id`, `schedule_link` FROM `users` "
+                                     "WHERE `subscription_status` = 1 AND `schedule_link` IS NOT NULL")
+        return result.fetchall()
+
+    def broadcast_exists(self, broadcast_id):
+        """Проверяем, подготовлена ли уже рассылка"""
+        result = self.cursor.execute("SELECT 1 FROM `broadcast_queue` WHERE `broadcast_id` = ? LIMIT 1",
+                                     (broadcast_id,))
+        return result.fetchone() is not None
+
+    def add_broadcast(self, broadcast_id, messages: dict[str, list[str]], recipients: list[tuple[int, str]]):
+        """
+        Записываем тексты рассылки по группам и очередь получателей одной транзакцией.
+        Получатели групп без текстов остаются в очереди, пока тексты не будут добавлены
+        """
+        self.__insert_broadcast_messages(broadcast_id, messages)
+        self.cursor.executemany("INSERT INTO `broadcast_queue` (`broadcast_id`, `user_id`, `group_id`) "
+                                "VALUES (?, ?, ?)",
+                                [(broadcast_id, user_id, group_id) for user_id, group_id in recipients])
+        return self.connection.commit()
+
+    def add_broadcast_messages(self, broadcast_id, messages: dict[str, list[str]]):
+        """Дописываем тексты рассылки для групп, расписание которых не удалось получить при подготовке"""
+        self.__insert_broadcast_messages(broadcast_id, messages)
+        return self.connection.commit()
+
+    def __insert_broadcast_messages(self, broadcast_id, messages: dict[str, list[str]]):
+        self.cursor.executemany("INSERT OR IGNORE INTO `broadcast_messages` (`broadcast_id`, `group_id`, `seq`, `text`) "
+                                "VALUES (?, ?, ?, ?)",
+                                [(broadcast_id, group_id, seq, text)
+                                 for group_id, texts in messages.items() for seq, text in enumerate(texts)])
+
+    def get_broadcast_messages(self, broadcast_id):
+        """Получаем тексты рассылки: group_id -> список сообщений по порядку"""
+        result = self.cursor.execute("SELECT `group_id`, `text` FROM `broadcast_messages` "
+                                     "WHERE `broadcast_id` = ? ORDER BY `group_id`, `seq`", (broadcast_id,))
+        messages = {}
+        for group_id, text in result.fetchall():
+            messages.setdefault(group_id, []).append(text)
+        return messages
+
+    def get_pending_recipients(self, broadcast_id):
+        """Получаем (user_id, group_id, next_seq) получателей, которым рассылка ещё не доставлена"""
+        result = self.cursor.execute("SELECT `user_id`, `group_id`, `next_seq` FROM `broadcast_queue` "
+                                     "WHERE `broadcast_id` = ? AND `done` = 0", (broadcast_id,))
+        return result.fetchall()
+
+    def advance_recipient(self, broadcast_id, user_id, next_seq, done=False):
+        """Запоминаем, сколько сообщений рассылки уже отправлено пользователю"""
+        self.cursor.execute("UPDATE `broadcast_queue` SET `next_seq` = ?, `done` = ? "
+                            "WHERE `broadcast_id` = ? AND `user_id` = ?", (next_seq, int(done), broadcast_id, user_id))
+        return self.connection.commit()
+
+    def get_unfinished_broadcasts(self):
+        """Получаем id рассылок, прерванных до завершения"""
+        result = self.cursor.execute("SELECT DISTINCT `broadcast_id` FROM `broadcast_queue` WHERE `done` = 0")
+        return [row[0] for row in result.fetchall()]
+
     def close(self):
         """Закрываем соединение с БД"""
         self.connection.close()
@@ -0,0 +1,264 @@
+"""
+Еженедельная рассылка расписания подписчикам.
+
+Подписчики группируются по id группы: расписание каждой группы разбирается и оформляется один раз,
+после чего сообщения раздаются всем её участникам через очередь отправки с ограничением скорости.
+Очередь хранится в БД, поэтому прерванная рассылка продолжается с того же места после перезапуска.
+"""
+import asyncio
+import datetime
+import logging
+import time
+
+from aiogram import Bot
+from aiogram.utils.exceptions import (RetryAfter, BotBlocked, ChatNotFound, UserDeactivated, BadRequest,
+                                      TelegramAPIError)
+
+from BL.cache import ScheduleCache
+from BL.cur_week import get_cur_week
+from BL.parser import parse, parse_url
+from DB.db import BotDB
+from UI.messages import render_week, pack
+
+# Время еженедельной рассылки: воскресенье, 18:00
+DIGEST_WEEKDAY = 6
+DIGEST_TIME = datetime.time(18, 0)
+# Как часто досылать рассылки, оставшиеся недоставленными из-за временных ошибок (в секундах)
+RESUME_INTERVAL = 60 * 60
+# Ошибки, после которых писать пользователю бессмысленно: доставка считается завершённой
+PERMANENT_ERRORS = (BotBlocked, ChatNotFound, UserDeactivated, BadRequest)
+
+
+def get_broadcast_monday(broadcast_id: str) -> datetime.date:
+    """Понедельник недели, расписание которой рассылается (из id вида week-ГГГГ-ММ-ДД)."""
+    return datetime.date.fromisoformat(broadcast_id.removeprefix('week-'))
+
+
+class RateLimiter:
+    """Общий для всех отправителей темп: не больше rate сообщений в секунду."""
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate
+        self.__next_time = 0.0
+        self.__lock = asyncio.Lock()
+
+    async def wait(self):
+        """Дожидается своей очереди на отправку."""
+        async with self.__lock:
+            now = time.monotonic()
+            delay = self.__next_time - now
+            self.__next_time = max(now, self.__next_time) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def pause(self, seconds: float):
+        """Приостанавливает все отправки (например, после ответа Telegram 429)."""
+        self.__next_time = max(self.__next_time, time.monotonic() + seconds)
+
+
+class Broadcaster:
+    def __init__(self, bot: Bot, bot_db: BotDB, cache: ScheduleCache,
+                 concurrency: int = 8, rate: float = 25, max_retries: int = 5):
+        """
+        :param bot: бот, от имени которого идёт рассылка.
+        :param bot_db: база пользователей и очереди рассылки.
+        :param cache: кэш разобранных расписаний.
+        :param concurrency: сколько сообщений отправляется одновременно.
+        :param rate: общий предел сообщений в секунду (у Telegram - около 30).
+        :param max_retries: сколько раз повторять отправку после 429 или временной ошибки.
+        """
+        self.bot = bot
+        self.bot_db = bot_db
+        self.cache = cache
+        self.concurrency = concurrency
+        self.limiter = RateLimiter(rate)
+        self.max_retries = max_retries
+
+    async def prepare(self, broadcast_id: str, week: int):
+        """
+        Оформляет расписание каждой группы подписчиков один раз и ставит всех подписчиков в очередь.
+        Уже подготовленная рассылка повторно не готовится. Участники групп, расписание которых получить
+        не удалось, тоже ставятся в очередь: тексты для них будут получены повторно при отправке.
+
+        :param broadcast_id: id рассылки.
+        :param week: номер недели, расписание которой рассылается.
+        """
+        if self.bot_db.broadcast_exists(broadcast_id):
+            return
+
+        members: dict[str, list[int]] = {}
+        for user_id, schedule_link in self.bot_db.get_subscribers():
+            try:
+                group_id, _ = parse_url(schedule_link)
+            except AttributeError:
+                logging.warning(f"Некорректная ссылка на расписание у {user_id = }")
+                continue
+            members.setdefault(group_id, []).append(user_id)
+
+        messages = await self.__render_groups(members, week)
+
+        recipients = [(user_id, group_id) for group_id, user_ids in members.items() for user_id in user_ids]
+        self.bot_db.add_broadcast(broadcast_id, messages, recipients)
+        logging.info(f"Рассылка {broadcast_id}: {len(messages)} групп, {len(recipients)} получателей")
+
+    async def __render_groups(self, group_ids, week: int) -> dict[str, list[str]]:
+        """
+        Получает и оформляет расписание групп, по одному разу на группу.
+
+        :param group_ids: id групп.
+        :param week: номер недели.
+        :return: group_id -> сообщения; группы, расписание которых получить не удалось, пропускаются.
+        """
+        messages = {}
+        for group_id in group_ids:
+            url = f"https://ssau.ru/rasp?groupId={group_id}&selectedWeek={week}"
+            try:
+                if not (cached := self.cache.lookup(url)):
+                    # Загрузка и разбор блокирующие - выполняем их вне цикла событий, чтобы бот отвечал
+                    group, days = await asyncio.to_thread(parse, url)
+                    self.cache.put(parse_url(url), group, days)
+                    cached = group, days
+                group, days = cached
+            except Exception:
+                logging.exception(f"Не удалось получить расписание группы {group_id}, повторю позже")
+                continue
+            messages[group_id] = pack([f"Расписание для {group} на {week} неделю:"] + render_week(days))
+        return messages
+
+    async def send(self, broadcast_id: str):
+        """
+        Раздаёт подготовленную рассылку всем получателям, которым она ещё не доставлена.
+        Сначала повторно получает расписание групп, для которых его не удалось получить раньше;
+        их участники остаются в очереди, если не получилось и сейчас.
+
+        :param broadcast_id: id рассылки.
+        """
+        messages = self.bot_db.get_broadcast_messages(broadcast_id)
+        pending = self.bot_db.get_pending_recipients(broadcast_id)
+
+        if missing := {group_id for _, group_id, _ in pending} - messages.keys():
+            week = get_cur_week(get_broadcast_monday(broadcast_id))
+            if rendered := await self.__render_groups(sorted(missing), week):
+                self.bot_db.add_broadcast_messages(broadcast_id, rendered)
+                messages.update(rendered)
+
+        queue = asyncio.Queue()
+        for recipient in pending:
+            if recipient[1] in messages:
+                queue.put_nowait(recipient)
+
+        async def worker():
+            while True:
+                user_id, group_id, next_seq = await queue.get()
+                try:
+                    await self.__deliver(broadcast_id, user_id, messages.get(group_id, []), next_seq)
+                except Exception:
+                    logging.exception(f"Рассылка {broadcast_id}: ошибка отправки {user_id = }")
+                finally:
+                    queue.task_done()
+
+        workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+        join = asyncio.create_task(queue.join())
+        try:
+            done, _ = await asyncio.wait([join, *workers], return_when=asyncio.FIRST_COMPLETED)
+            # Отправитель может завершиться только аварийно - пробрасываем его ошибку, а не ждём вечно
+            for task in done - {join}:
+                task.result()
+        finally:
+            join.cancel()
+            for task in workers:
+                task.cancel()
+
+        if missing := {group_id for _, group_id, _ in pending} - messages.keys():
+            logging.warning(f"Рассылка {broadcast_id}: нет расписания для групп {', '.join(sorted(missing))}")
+        else:
+            logging.info(f"Рассылка {broadcast_id} завершена")
+
+    async def __deliver(self, broadcast_id: str, user_id: int, texts: list[str], next_seq: int):
+        """Отправляет пользователю оставшиеся сообщения, сохраняя прогресс после каждого."""
+        for seq in range(next_seq, len(texts)):
+            for attempt in range(self.max_retries + 1):
+                await self.limiter.wait()
+                try:
+                    await self.bot.send_message(user_id, texts[seq])
+                    break
+                except RetryAfter as error:
+                    logging.warning(f"Telegram просит подождать {error.timeout} с")
+                    self.limiter.pause(error.timeout)
+                except PERMANENT_ERRORS as error:
+                    # Пользователю больше нельзя писать (заблокировал бота, удалил чат) - считаем доставку завершённой
+                    logging.warning(f"Рассылка {broadcast_id}: {user_id = } недоступен: {error}")
+                    self.bot_db.advance_recipient(broadcast_id, user_id, seq, done=True)
+                    return
+                except TelegramAPIError as error:
+                    # Сетевые сбои и ошибки сервера Telegram временные - повторяем с нарастающей паузой
+                    delay = min(2 ** attempt, 60)
+                    logging.warning(f"Рассылка {broadcast_id}: {error}, повтор через {delay} с")
+                    await asyncio.sleep(delay)
+            else:
+                # Запись остаётся в очереди, её дошлёт resume()
+                raise TelegramAPIError(f"Превышено число повторов отправки для {user_id = }")
+
+            self.bot_db.advance_recipient(broadcast_id, user_id, seq + 1, done=seq + 1 == len(texts))
+
+        if next_seq >= len(texts):
+            self.bot_db.advance_recipient(broadcast_id, user_id, next_seq, done=True)
+
+    async def resume(self):
+        """Дослать рассылки, прерванные падением или перезапуском."""
+        today = datetime.date.today()
+        for broadcast_id in self.bot_db.get_unfinished_broadcasts():
+            # Расписание на уже закончившуюся неделю досылать незачем
+            monday = get_broadcast_monday(broadcast_id)
+            if monday + datetime.timedelta(days=7) <= today:
+                continue
+
+            logging.info(f"Продолжаю прерванную рассылку {broadcast_id}")
+            await self.send(broadcast_id)
+
+    async def run(self, today: datetime.date = None):
+        """
+        Готовит и отправляет рассылку расписания на неделю, следующую за today.
+        Повторный запуск для той же недели лишь досылает недоставленное.
+        """
+        today = today or datetime.date.today()
+        next_monday = today + datetime.timedelta(days=7 - today.weekday())
+        broadcast_id = f"week-{next_monday.isoformat()}"
+
+        await self.prepare(broadcast_id, get_cur_week(next_monday))
+        await self.send(broadcast_id)
+
+    async def run_weekly(self):
+        """
+        Бесконечный цикл: досылает прерванные рассылки, догоняет пропущенную
+        (если бот был выключен в момент рассылки) и каждое воскресенье вечером запускает новую.
+        """
+        await self.__logged(self.resume())
+
+        now = datetime.datetime.now()
+        days_back = (now.weekday() - DIGEST_WEEKDAY) % 7
+        last_moment = datetime.datetime.combine(now.date() - datetime.timedelta(days=days_back), DIGEST_TIME)
+        if last_moment > now:
+            last_moment -= datetime.timedelta(days=7)
+        # Последняя по времени рассылка могла не состояться или не успеть подготовиться,
+        # её неделя ещё не закончилась; уже отправленная повторно не уйдёт
+        await self.__logged(self.run(last_moment.date()))
+
+        moment = last_moment + datetime.timedelta(days=7)
+        while True:
+            now = datetime.datetime.now()
+            if now >= moment:
+                await self.__logged(self.run(moment.date()))
+                moment += datetime.timedelta(days=7)
+                continue
+
+            await asyncio.sleep(min((moment - now).total_seconds(), RESUME_INTERVAL))
+            if datetime.datetime.now() < moment:
+                await self.__logged(self.resume())
+
+    @staticmethod
+    async def __logged(coroutine):
+        try:
+            await coroutine
+        except Exception:
+            logging.exception("Рассылка завершилась с ошибкой")
@@ -0,0 +1,63 @@
+"""
+Оформление расписания в виде сообщений Telegram (HTML-разметка).
+"""
+from BL.schedule import Day, Days
+
+# Ограничение Telegram на длину одного сообщения
+MAX_MESSAGE_LENGTH = 4096
+
+
+def render_day(day: Day, type_short: str = 'dict') -> str:
+    """
+    Сообщение с расписанием на один день. Окна после последней пары не выводятся.
+
+    :param day: учебный день.
+    :param type_short: способ сокращения названий дисциплин (см. BL.abbreviator).
+    :return: текст сообщения.
+    """
+    msg = f"<b>{day.name.title()}</b> - <i>{day.date.strftime('%d.%m.%Y')}</i>\n\n"
+    if len(day):
+        pairs = []
+        exists = False
+        for pair in reversed(list(day)):
+
+            if pair.exist:
+                exists = True
+
+            if not exists:
+                continue
+
+            if pair.exist:
+                pairs.append(f"<b>{pair.number}</b> | {pair.time} | "
+                             f"<b><u>{pair.discipline[type_short]}</u></b> | "
+                             f"{'online' if pair.place.online else pair.place} | ")
+            else:
+                pairs.append(f"<b>{pair.number}</b> | {pair.time} | {'-' * 15}")
+
+        pairs.reverse()
+        msg += '\n'.join(pairs)
+    else:
+        msg += 'В этот день нет пар - чилим 😎'
+    return msg
+
+
+def render_week(days: Days) -> list[str]:
+    """Сообщения с расписанием на неделю, по одному на день."""
+    return [render_day(day) for day in days]
+
+
+def pack(texts: list[str], limit: int = MAX_MESSAGE_LENGTH) -> list[str]:
+    """
+    Склеивает подряд идущие тексты в как можно меньшее число сообщений не длиннее limit.
+
+    :param texts: тексты сообщений по порядку.
+    :param limit: максимальная длина одного сообщения.
+    :return: список склеенных сообщений.
+    """
+    messages = []
+    for text in texts:
+        if messages and len(messages[-1]) + 2 + len(text) <= limit:
+            messages[-1] += '\n\n' + text
+        else:
+            messages.append(text)
+    return messages
@@ -1,18 +1,21 @@
 import asyncio
 import datetime
 import logging
+import signal
 
-import requests
 from aiogram import Bot, Dispatcher
 from aiogram import types
 from aiogram.types import ReplyKeyboardMarkup, KeyboardButton
 
+from BL.cache import ScheduleCache
 from BL.cur_week import get_cur_week
-from BL.parser import parse
+from BL.index import LECTOR, ROOM
+from BL.parser import REQUEST_TIMEOUT
+from BL.schedule import get_pair_number, timetable, MAX_PAIRS
 from DB.db import BotDB
-from settings import config
+from UI.broadcast import Broadcaster
+from UI.messages import render_week
 
-BOT_DB = BotDB(config.database_filename)
 exampleURL = 'https://ssau.ru/rasp?groupId='
 
 HELP_COMMAND = """
@@ -21,24 +24,107 @@ HELP_COMMAND = """
 • <b>/start</b> - для первого знакомства
 • <b>/get</b> - для получения расписания на текущую неделю
 • <b>/set</b> - для смены ссылки расписания
+• <b>/lector фамилия</b> - где сейчас преподаватель
+• <b>/room аудитория [номер пары]</b> - свободна ли аудитория сегодня
+• <b>/subscribe</b> - получать расписание на следующую неделю каждое воскресенье вечером
+• <b>/unsubscribe</b> - отписаться от рассылки
 """
 
 
 class TelegramBot:
-    bot = Bot(token=config.bot_token.get_secret_value(), parse_mode="HTML")
-    dp = Dispatcher(bot)
+    def __init__(self, token: str, bot_db: BotDB, cache: ScheduleCache = None, snapshot_interval: int = 300):
+        """
+        Создаёт бота и диспетчер и регистрирует обработчики команд.
 
-    @staticmethod
-    async def run():
-        await TelegramBot.dp.start_polling(TelegramBot.bot)
+        :param token: токен телеграм-бота.
+        :param bot_db: открытое подключение к базе пользователей.
+        :param cache: кэш разобранных расписаний.
+        :param snapshot_interval: период сохранения снимка кэша в секундах.
+        """
+        self.bot_db = bot_db
+        self.cache = cache or ScheduleCache()
+        self.snapshot_interval = snapshot_interval
+        self.bot = Bot(token=token, parse_mode="HTML")
+        self.dp = Dispatcher(self.bot)
+        self.broadcaster = Broadcaster(self.bot, self.bot_db, self.cache)
+
+        self.__register_handlers()
+
+    def __register_handlers(self):
+        # Порядок важен: обработчик без фильтров должен регистрироваться последним
+        self.dp.register_message_handler(self.cmd_start, commands="start")
+        self.dp.register_message_handler(self.cmd_lector, commands="lector")
+        self.dp.register_message_handler(self.cmd_room, commands="room")
+        self.dp.register_message_handler(self.cmd_subscribe, commands="subscribe")
+        self.dp.register_message_handler(self.cmd_unsubscribe, commands="unsubscribe")
+        self.dp.register_message_handler(self.cmd_help, regexp=r"[Пп]омощь|[Hh]elp")
+        self.dp.register_message_handler(self.cmd_get, regexp=r"Получить расписание|get")
+        self.dp.register_message_handler(self.cmd_set, commands="set")
+        self.dp.register_message_handler(self.set_schedule_link)
+
+    async def run(self):
+        terminated = self.__stop_on_sigterm()
+        tasks = [asyncio.create_task(self.__autosave()), asyncio.create_task(self.broadcaster.run_weekly())]
+        try:
+            await self.dp.start_polling()
+        except asyncio.CancelledError:
+            # Остановка по SIGTERM - штатное завершение, дальше вызывающий код выполнит shutdown()
+            if not terminated.is_set():
+                raise
+            logging.info("Получен SIGTERM, бот останавливается")
+        finally:
+            for task in tasks:
+                task.cancel()
 
     @staticmethod
-    @dp.message_handler(commands="start")
-    async def cmd_start(message: types.Message):
+    def __stop_on_sigterm() -> asyncio.Event:
+        """
+        Отменяет текущую задачу по SIGTERM (так процесс останавливают при деплое),
+        чтобы сработали блоки finally и снимок кэша сохранился, как и при Ctrl+C.
+
+        :return: событие, выставляемое при получении SIGTERM.
+        """
+        terminated = asyncio.Event()
+        task = asyncio.current_task()
+
+        def handler():
+            terminated.set()
+            task.cancel()
+
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, handler)
+        except (NotImplementedError, RuntimeError):
+            # На Windows обработчики сигналов в цикле событий не поддерживаются
+            pass
+        return terminated
+
+    async def __autosave(self):
+        """Периодически сохраняет снимок кэша, чтобы после падения не начинать с холодного кэша."""
+        while True:
+            await asyncio.sleep(self.snapshot_interval)
+            try:
+                self.cache.save()
+            except Exception:
+                logging.exception("Не удалось сохранить снимок кэша")
+
+    async def shutdown(self):
+        """Сохраняет снимок кэша, закрывает сетевую сессию бота и соединение с БД."""
+        try:
+            self.cache.save()
+        except Exception:
+            logging.exception("Не удалось сохранить снимок кэша")
+        finally:
+            try:
+                session = await self.bot.get_session()
+                await session.close()
+            finally:
+                self.bot_db.close()
+
+    async def cmd_start(self, message: types.Message):
         logging.debug(f"start {message.from_user.id = } {datetime.datetime.now()}")
 
-        if not BOT_DB.user_exists(message.from_user.id):
-            BOT_DB.add_user(message.from_user.id, message.from_user.full_name)
+        if not self.bot_db.user_exists(message.from_user.id):
+            self.bot_db.add_user(message.from_user.id, message.from_user.full_name)
             logging.info(f"add new user: {message.from_user.id = }")
 
             await message.answer(f'Привет, {message.from_user.first_name}!\n'
@@ -47,76 +133,112 @@ class TelegramBot:
                                  f'чтобы я мог запомнить его для тебя :)')
         else:
             await message.answer(f"Всё ок, {message.from_user.first_name}, я тебя помню.\n"
-                                 f"Твоя ссылка на расписание:\n{BOT_DB.get_schedule_link(message.from_user.id)}")
+                                 f"Твоя ссылка на расписание:\n{self.bot_db.get_schedule_link(message.from_user.id)}")
 
-    @staticmethod
-    @dp.message_handler(regexp=r"[Пп]омощь|[Hh]elp")
-    async def cmd_help(message: types.Message):
+    async def cmd_help(self, message: types.Message):
         logging.debug(f"help {message.from_user.id = } {datetime.datetime.now()}")
 
         await message.answer(text=HELP_COMMAND)
 
-    @staticmethod
-    @dp.message_handler(regexp=r"Получить расписание|get")
-    async def cmd_get(message: types.Message):
+    async def cmd_get(self, message: types.Message):
         logging.debug(f"get {message.from_user.id = } {datetime.datetime.now()}")
 
-        if BOT_DB.user_exists(message.from_user.id):
-            schedule_url = BOT_DB.get_schedule_link(message.from_user.id)
+        if self.bot_db.user_exists(message.from_user.id):
+            schedule_url = self.bot_db.get_schedule_link(message.from_user.id)
 
             if schedule_url:
 
-                group, days = parse(schedule_url)
+                group, days = self.cache.get(schedule_url)
                 await message.answer("Готово 😉\n"
                                      f"Расписания для {group} на {get_cur_week()} неделю:")
 
-                type_short = 'dict'
-                for day in days:
-                    msg = f"<b>{day.name.title()}</b> - <i>{day.date.strftime('%d.%m.%Y')}</i>\n\n"
-                    if len(day):
-                        pairs = []
-                        exists = False
-                        for pair in reversed(list(day)):
-
-                            if pair.exist:
-                                exists = True
-
-                            if not exists:
-                                continue
-
-                            if pair.exist:
-                                pairs.append(f"<b>{pair.number}</b> | {pair.time} | "
-                                             f"<b><u>{pair.discipline[type_short]}</u></b> | "
-                                             f"{'online' if pair.place.online else pair.place} | ")
-                            else:
-                                pairs.append(f"<b>{pair.number}</b> | {pair.time} | {'-' * 15}")
-
-                        pairs.reverse()
-                        msg += '\n'.join(pairs)
-                    else:
-                        msg += 'В этот день нет пар - чилим 😎'
+                for msg in render_week(days):
                     await message.answer(msg)
             else:
                 await message.answer("Сначала отправь мне ссылку на расписание")
         else:
             await message.answer("Но мы же ещё не знакомы 🤨.\nНапиши команду /start для знакомства.")
 
-    @staticmethod
-    @dp.message_handler(commands="set")
-    async def cmd_set(message: types.Message):
+    async def cmd_set(self, message: types.Message):
         logging.debug(f"help {message.from_user.id = } {datetime.datetime.now()}")
 
         await message.answer(f'Просто скинь мне ссылку на твоё расписание в следующем формате:\n'
                              f'{exampleURL}#########, где вместо решёток id твоей группы')
 
-    @staticmethod
-    @dp.message_handler()
-    async def set_schedule_link(message: types.Message):
+    async def cmd_lector(self, message: types.Message):
+        logging.debug(f"lector {message.from_user.id = } {datetime.datetime.now()}")
+
+        name = message.get_args()
+        if not name:
+            await message.answer("Напиши фамилию преподавателя после команды, например: /lector Иванов")
+            return
+
+        now = datetime.datetime.now()
+        number = get_pair_number(now.time())
+        if number is None:
+            await message.answer("Сейчас пар нет 🙂")
+            return
+
+        hits = self.cache.index.find(LECTOR, name, now.date(), number)
+        if hits:
+            places = '\n'.join(f"• <b>{room or '?'}</b> - {group}" for group, room in sorted(hits))
+            await message.answer(f"Сейчас идёт <b>{number}</b> пара ({timetable[number - 1]}), {name} сейчас:\n"
+                                 f"{places}")
+        else:
+            await message.answer(f"По известным мне расписаниям у {name} сейчас нет пары")
+
+    async def cmd_room(self, message: types.Message):
+        logging.debug(f"room {message.from_user.id = } {datetime.datetime.now()}")
+
+        args = message.get_args().split()
+        if not args:
+            await message.answer("Напиши аудиторию после команды, например: /room 401-5 3")
+            return
+
+        now = datetime.datetime.now()
+        if len(args) > 1 and args[-1].isdigit():
+            number = int(args.pop())
+        else:
+            number = get_pair_number(now.time())
+
+        if number is None or not 0 < number <= MAX_PAIRS:
+            await message.answer(f"Укажи номер пары от 1 до {MAX_PAIRS}")
+            return
+
+        room = ' '.join(args)
+        groups = {group for group, _ in self.cache.index.find(ROOM, room, now.date(), number)}
+        if groups:
+            await message.answer(f"Аудитория {room} занята на {number} паре: {', '.join(sorted(groups))}")
+        else:
+            await message.answer(f"По известным мне расписаниям аудитория {room} свободна на {number} паре")
+
+    async def cmd_subscribe(self, message: types.Message):
+        logging.debug(f"subscribe {message.from_user.id = } {datetime.datetime.now()}")
+
+        if not self.bot_db.user_exists(message.from_user.id):
+            await message.answer("Но мы же ещё не знакомы 🤨.\nНапиши команду /start для знакомства.")
+        elif not self.bot_db.get_schedule_link(message.from_user.id):
+            await message.answer("Сначала отправь мне ссылку на расписание")
+        else:
+            self.bot_db.set_subscription(message.from_user.id, True)
+            await message.answer("Готово 😉 Каждое воскресенье вечером я буду присылать расписание на следующую неделю")
+
+    async def cmd_unsubscribe(self, message: types.Message):
+        logging.debug(f"unsubscribe {message.from_user.id = } {datetime.datetime.now()}")
+
+        if self.bot_db.user_exists(message.from_user.id):
+            self.bot_db.set_subscription(message.from_user.id, False)
+        await message.answer("Хорошо, больше не буду присылать расписание по воскресеньям")
+
+    async def set_schedule_link(self, message: types.Message):
         schedule_url = message.text
         if exampleURL in schedule_url:
-            if requests.get(schedule_url).status_code == 200:
-                if BOT_DB.user_exists(message.from_user.id):
-                    BOT_DB.set_schedule_link(message.from_user.id, schedule_url)
+            # requests нужен только здесь, не загружаем его при старте
+            import requests
+
+            if requests.get(schedule_url, timeout=REQUEST_TIMEOUT).status_code == 200:
+                if self.bot_db.user_exists(message.from_user.id):
+                    self.bot_db.set_schedule_link(message.from_user.id, schedule_url)
 
                     kb = ReplyKeyboardMarkup(resize_keyboard=True)
                     button_get_schedule = KeyboardButton(text="Получить расписание")
@@ -132,9 +254,29 @@ class TelegramBot:
             await message.answer("Извини я не знаю что ответить")
 
 
+def create_app(config=None) -> TelegramBot:
+    """
+    Фабрика приложения: валидирует конфиг, открывает БД и создаёт бота.
+
+    :param config: объект настроек, по умолчанию берётся из settings.
+    :return: готовый к запуску бот.
+    """
+    if config is None:
+        from settings import get_config
+        config = get_config()
+
+    return TelegramBot(config.bot_token.get_secret_value(),
+                       BotDB(config.database_filename),
+                       ScheduleCache(config.snapshot_filename),
+                       config.snapshot_interval)
+
+
 async def main():
-    bot = TelegramBot()
-    await bot.run()
+    bot = create_app()
+    try:
+        await bot.run()
+    finally:
+        await bot.shutdown()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,93 @@
+"""
+Сравнение построения сетки пар учебного дня: прежний алгоритм (сортировка и заполнение окон
+вложенными next()) против раскладки по слотам за один проход.
+
+Запуск из корня проекта:
+    python benchmarks/day_update.py [--repeat N]
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from BL.schedule import Day, Pair, MAX_PAIRS  # noqa: E402
+
+AMOUNT_DAYS = 6
+
+
+def legacy_update(pairs: list[Pair]) -> list[Pair]:
+    """Прежняя реализация Day.__update (хвостовые окна в ней терялись)."""
+    buff = []
+    number = 1
+    try:
+        pairs = iter(sorted(pairs))
+        cur_pair = next(pairs)
+        while number <= MAX_PAIRS:
+            if number == cur_pair.number:
+                buff.append(cur_pair)
+                cur_pair = next(pairs)
+            else:
+                buff.append(Pair('', number=number, exist=False))
+
+            while cur_pair.number == number:
+                buff.append(cur_pair)
+                cur_pair = next(pairs)
+
+            number += 1
+
+    except StopIteration:
+        pass
+
+    return buff
+
+
+def legacy_placement(cells: list[Pair | None], dates: list[datetime.date]) -> list[list[Pair]]:
+    """Прежняя раскладка: окно на каждую пустую ячейку, затем reshape и zip по дням."""
+    cells = [pair or Pair('', number=cell // AMOUNT_DAYS + 1, exist=False) for cell, pair in enumerate(cells)]
+    rows = [cells[i * AMOUNT_DAYS:(i + 1) * AMOUNT_DAYS] for i in range(-(-len(cells) // AMOUNT_DAYS))]
+    return [legacy_update(list(day_pairs)) for _, *day_pairs in zip(dates, *rows)]
+
+
+def bucket_placement(cells: list[Pair | None], dates: list[datetime.date]) -> list[Day]:
+    """Новая раскладка: ячейки сразу попадают в слоты [день][номер пары]."""
+    slots = [[[] for _ in range(MAX_PAIRS)] for _ in range(AMOUNT_DAYS)]
+    for cell, pair in enumerate(cells):
+        if pair:
+            slots[cell % AMOUNT_DAYS][cell // AMOUNT_DAYS].append(pair)
+    return [Day(date=date, slots=day_slots) for date, day_slots in zip(dates, slots)]
+
+
+def make_week(seed: int = 0) -> list[Pair | None]:
+    """Плоский список ячеек недели в порядке чтения таблицы (построчно), около половины пустые (None)."""
+    rnd = random.Random(seed)
+    return [Pair(f"disc#{cell}", number=cell // AMOUNT_DAYS + 1) if rnd.random() < 0.5 else None
+            for cell in range(AMOUNT_DAYS * MAX_PAIRS)]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--repeat', type=int, default=2000, help='кол-во повторов каждого замера')
+    args = arg_parser.parse_args()
+
+    monday = datetime.date.today() - datetime.timedelta(days=datetime.date.today().weekday())
+    dates = [monday + datetime.timedelta(days=i) for i in range(AMOUNT_DAYS)]
+    cells = make_week()
+    day_pairs = [pair for pair in reversed(cells) if pair][:MAX_PAIRS]
+
+    cases = {
+        'построение дня (Day.__update)': (lambda: legacy_update(day_pairs), lambda: Day(day_pairs, date=monday)),
+        'раскладка ячеек недели': (lambda: legacy_placement(cells, dates), lambda: bucket_placement(cells, dates)),
+    }
+
+    for title, (legacy, current) in cases.items():
+        legacy_us = min(timeit.repeat(legacy, number=args.repeat, repeat=5)) / args.repeat * 1e6
+        current_us = min(timeit.repeat(current, number=args.repeat, repeat=5)) / args.repeat * 1e6
+        print(f"{title}: было {legacy_us:.1f} мкс, стало {current_us:.1f} мкс ({legacy_us / current_us:.2f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Замер времени импорта модулей бота через `python -X importtime`.
+
+Запуск из корня проекта:
+    python benchmarks/startup.py [модуль] [--budget мс] [--top N]
+
+Завершается с кодом 1, если суммарное время импорта модуля превышает бюджет.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Бюджет на импорт точки входа бота в миллисекундах
+DEFAULT_BUDGET_MS = 400
+
+
+def import_times(module: str) -> list[tuple[int, int, str]]:
+    """
+    Импортирует модуль в отдельном процессе и разбирает вывод -X importtime.
+
+    :param module: имя импортируемого модуля.
+    :return: список (собственное время, суммарное время, имя модуля) в микросекундах.
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=ROOT, capture_output=True, text=True)
+    if result.returncode:
+        raise RuntimeError(f"Не удалось импортировать {module}:\n{result.stderr}")
+
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        times.append((int(self_us), int(cumulative_us), name.rstrip()))
+    return times
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('module', nargs='?', default='UI.telegram_bot')
+    arg_parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET_MS, help='бюджет в мс')
+    arg_parser.add_argument('--top', type=int, default=15, help='сколько самых долгих модулей показать')
+    args = arg_parser.parse_args()
+
+    times = import_times(args.module)
+    total_ms = next(cumulative for _, cumulative, name in times if name.strip() == args.module) / 1000
+
+    print(f"{'self, мс':>10} {'всего, мс':>10}  модуль")
+    for self_us, cumulative_us, name in sorted(times, key=lambda t: t[1], reverse=True)[:args.top]:
+        print(f"{self_us / 1000:>10.1f} {cumulative_us / 1000:>10.1f} {name}")
+
+    print(f"\nИмпорт {args.module}: {total_ms:.1f} мс (бюджет {args.budget:.0f} мс)")
+    for heavy in 'requests', 'bs4', 'lxml', 'prettytable':
+        if any(name.strip() == heavy for *_, name in times):
+            print(f"Внимание: при старте импортирован {heavy}")
+
+    if total_ms > args.budget:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
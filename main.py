@@ -1,14 +1,18 @@
 import asyncio
 import logging
 
-from UI.telegram_bot import TelegramBot
+from UI.telegram_bot import create_app
 
 logging.basicConfig(level=logging.INFO)
 
 
 async def main():
-    bot = TelegramBot()
-    await bot.run()
+    # БД и бот создаются только здесь, а не при импорте модулей
+    bot = create_app()
+    try:
+        await bot.run()
+    finally:
+        await bot.shutdown()
 
 
 if __name__ == '__main__':
@@ -1,3 +1,5 @@
+from functools import lru_cache
+
 from pydantic import BaseSettings, SecretStr
 
 
@@ -7,6 +9,9 @@ class Settings(BaseSettings):
     bot_token: SecretStr
     # Имя файла базы данных
     database_filename = 'DB/schedule.db'
+    # Файл снимка кэша разобранных расписаний и период его сохранения в секундах
+    snapshot_filename = 'DB/cache.snapshot'
+    snapshot_interval = 300
 
     # Вложенный класс с дополнительными указаниями для настроек
     class Config:
@@ -17,7 +22,18 @@ class Settings(BaseSettings):
         env_file_encoding = 'utf-8'
 
 
-# При импорте файла сразу создастся
-# и провалидируется объект конфига,
-# который можно далее импортировать из разных мест
-config = Settings()
+@lru_cache(maxsize=None)
+def get_config() -> Settings:
+    """
+    Создаёт и валидирует объект конфига при первом обращении,
+    далее возвращает уже созданный объект.
+    """
+    return Settings()
+
+
+def __getattr__(name: str):
+    # Обратная совместимость с `from settings import config`:
+    # конфиг валидируется только тогда, когда он действительно нужен
+    if name == 'config':
+        return get_config()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")